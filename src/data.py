@@ -5,15 +5,110 @@
 # M2 MVA, ENS Paris-Saclay
 
 
-import json
-import numpy as np
 import os
+# must be set before numpy loads its BLAS (thread count is fixed at library
+# load) so the forked grid workers don't oversubscribe the machine
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+
+import numpy as np
+import orjson
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
 warnings.filterwarnings(action="ignore")
 
 from mini_rl_lib.mdp_factory import MDPFactory
 from mini_rl_lib.enums import MDPTransitionType, MDPRewardType, PolicyType
+from mini_rl_lib.utils import reseed, terminate_s, transition
+
+
+def simulate_batch(factory, policy, n_replay, max_step, random_play_p, rng, data_dir=None):
+    """ Simulates all replay episodes in parallel with NumPy vector ops
+
+    All episodes start from state 0 and advance together; per step, a
+    (n_replay,) state vector is moved with fancy indexing (deterministic
+    transitions) or batched inverse-CDF sampling (probabilistic ones),
+    instead of n_replay x max_step Python-level environment steps.
+    random_play_p may be a scalar or a per-episode (n_replay,) vector.
+    With data_dir set, the trajectory buffers are .npy memmaps in that
+    directory and step columns stream to disk instead of RAM.
+
+    :return (states, actions, rewards, lengths)
+        states, actions, rewards: arrays of shape (n_replay, max_step)
+        lengths: array of shape (n_replay,), recorded steps per episode
+    """
+    config = factory.model.config
+    n_actions = config.n_actions
+    transitions = factory.transitions
+    terminate_s_flags = factory.terminate_s_flags
+
+    # narrow dtypes halve the bandwidth of persistence and training loads,
+    # and torch.from_numpy picks the arrays up copy-free later
+    action_dtype = np.int8 if n_actions < 128 else np.int32
+    if data_dir is None:
+        all_states  = np.zeros((n_replay, max_step), dtype=np.int32)
+        all_actions = np.zeros((n_replay, max_step), dtype=action_dtype)
+        all_rewards = np.zeros((n_replay, max_step), dtype=np.float32)
+    else:
+        all_states  = np.lib.format.open_memmap(data_dir + "states.npy", mode="w+",
+                                                dtype=np.int32, shape=(n_replay, max_step))
+        all_actions = np.lib.format.open_memmap(data_dir + "actions.npy", mode="w+",
+                                                dtype=action_dtype, shape=(n_replay, max_step))
+        all_rewards = np.lib.format.open_memmap(data_dir + "rewards.npy", mode="w+",
+                                                dtype=np.float32, shape=(n_replay, max_step))
+    lengths = np.zeros(n_replay, dtype=np.int32)
+
+    states = np.zeros(n_replay, dtype=int)
+    alive = np.ones(n_replay, dtype=bool)
+
+    # one bulk RNG call for the whole batch instead of one per step
+    random_masks = rng.random((n_replay, max_step)) < np.reshape(random_play_p, (-1, 1))
+    random_actions = rng.integers(0, n_actions, (n_replay, max_step))
+
+    for t in range(max_step):
+        actions = np.where(random_masks[:, t], random_actions[:, t], policy[states])
+
+        if config.transition_function_type is MDPTransitionType.S_DETERMINISTIC:
+            next_states = transitions[states]
+        elif config.transition_function_type is MDPTransitionType.SA_DETERMINISTIC:
+            next_states = transitions[states, actions]
+        else:
+            if config.transition_function_type is MDPTransitionType.S_PROBABILISTIC:
+                probas = transitions[states]
+            else:
+                probas = transitions[states, actions]
+            cumulative = probas.cumsum(axis=1)
+            draws = rng.random(n_replay)[:, np.newaxis] * cumulative[:, -1:]
+            next_states = (draws < cumulative).argmax(axis=1)
+
+        if config.reward_function_type is MDPRewardType.S:
+            rewards = factory.rewards[states]
+        elif config.reward_function_type is MDPRewardType.SA:
+            rewards = factory.rewards[states, actions]
+        elif config.reward_function_type is MDPRewardType.SAS:
+            rewards = factory.rewards[states, actions, next_states]
+        else:
+            probas = factory.rewards[states, actions, next_states]
+            cumulative = probas.cumsum(axis=1)
+            draws = rng.random(n_replay)[:, np.newaxis] * cumulative[:, -1:]
+            rewards = factory.all_rewards[(draws < cumulative).argmax(axis=1)]
+
+        all_states[alive, t]  = states[alive]
+        all_actions[alive, t] = actions[alive]
+        all_rewards[alive, t] = rewards[alive]
+        lengths[alive] += 1
+
+        alive &= ~terminate_s_flags[next_states]
+        states = next_states
+        if not alive.any():
+            break
+
+    if data_dir is not None:
+        all_states.flush()
+        all_actions.flush()
+        all_rewards.flush()
+
+    return all_states, all_actions, all_rewards, lengths
 
 
 def create(
@@ -34,7 +129,9 @@ def create(
     seed=42,
     verbose=True,
     base_dir=".",
-    data_dir_name=None
+    data_dir_name=None,
+    terminate_s_flags=None,
+    transitions=None
 ):
 
     if data_dir_name is None:
@@ -54,68 +151,37 @@ def create(
         gamma=gamma,
         eps=eps,
         alpha=alpha,
-        policy_type=policy_type
+        policy_type=policy_type,
+        terminate_s_flags=terminate_s_flags,
+        transitions=transitions
     )
 
     factory.train_policy(n_epidoes=train_n_episodes)
     policy = factory.policy.get_policy()
-    
-    target_return = 0.
-    state, info = factory.model.reset(seed=seed)
+
+    # one greedy probe episode measures the expert's empirical episodic
+    # return; V[start] is not usable as target_return because the backups
+    # do not make terminal states absorbing, so the value function keeps
+    # accumulating reward past episode ends
+    rng = np.random.default_rng(seed)
+    _, _, expert_rewards, expert_lengths = simulate_batch(
+        factory, policy, 1, max_step, 0., rng)
+    target_return = float(expert_rewards[0, :expert_lengths[0]].sum())
     if verbose:
         print("Policy expert-level")
-        print(". =>", state, None, False, False, info)
-    for _ in range(max_step):
-        action = policy[state]
-        state, reward, terminated, truncated, info = factory.model.step(action)
-        target_return += float(reward)
-        if verbose:
-            print(action, "=>", state, reward, terminated, truncated, info)
-        if terminated or truncated:
-            break
+        print(f"return: {target_return} in {int(expert_lengths[0])} steps")
 
-    data_min_step = max_step
-    data_max_step = 0
+    replay_states, replay_actions, replay_rewards, lengths = simulate_batch(
+        factory, policy, n_replay, max_step, random_play_p, rng, data_dir=data_dir)
 
-    data = []
-    for i in range(n_replay):
-        states  = []
-        actions = []
-        rewards = []
-        times   = []
-
-        state, info = factory.model.reset(seed=seed)
-        state = factory.model._current_state
-        if verbose:
-            print(f"\n{'='*100}\nPlay {i}")
-            print(". =>", state, None, False, False, info)
-
-        for t in range(max_step):
-            player = "policy"
-            if np.random.random() < random_play_p:
-                player = "random"
-                action = factory.model.action_space.sample()
-            else:
-                action = policy[state]   
-            next_state, reward, terminated, truncated, info = factory.model.step(action)
-            states.append(int(state))
-            actions.append(int(action))
-            rewards.append(float(reward))
-            times.append(int(t))
-            state = next_state
-
-            if verbose:
-                print(f"[{player}]", action, "=>", next_state, reward, terminated, truncated, info)
-            if terminated or truncated:
-                break
-        
-        if t < data_min_step:
-            data_min_step = t
-        if t > data_max_step:
-            data_max_step = t
-
-        item = [states, actions, rewards, times]
-        data.append(item)
+    data_min_step = int(lengths.min()) - 1
+    data_max_step = int(lengths.max()) - 1
+
+    if verbose:
+        # formatted in one pass and flushed with a single write
+        lines = [f"Play {i}: {int(lengths[i])} steps, return {replay_rewards[i, :lengths[i]].sum()}"
+                 for i in range(n_replay)]
+        print("\n".join(lines))
     
     metadata = {
         "n_states": n_states,
@@ -130,29 +196,56 @@ def create(
     }
 
     factory.save(data_dir + "model.json")
-    with open(data_dir + "metadata.json", "w") as file:
-        json.dump(metadata, file)
-    with open(data_dir + "data.json", "w") as file:
-        json.dump(data, file)
+    with open(data_dir + "metadata.json", "wb") as file:
+        file.write(orjson.dumps(metadata))
+    np.save(data_dir + "lengths.npy", lengths)
 
 
 def load(data_dir):
     factory = MDPFactory.load(data_dir + "model.json")
-    with open(data_dir + "metadata.json", "r") as file:
-        metadata = json.load(file)
-    with open(data_dir + "data.json", "r") as file:
-        data = json.load(file)
+    with open(data_dir + "metadata.json", "rb") as file:
+        metadata = orjson.loads(file.read())
+    states  = np.load(data_dir + "states.npy", mmap_mode="r")
+    actions = np.load(data_dir + "actions.npy", mmap_mode="r")
+    rewards = np.load(data_dir + "rewards.npy", mmap_mode="r")
+    lengths = np.load(data_dir + "lengths.npy")
+    data = []
+    for i in range(len(lengths)):
+        n = int(lengths[i])
+        data.append([states[i, :n], actions[i, :n], rewards[i, :n], np.arange(n)])
     return factory, metadata, data
 
 
+def _create_config(config):
+    n_states, n_actions, all_n_rewards, seed_seq = config
+    # forked workers inherit the parent's generator state byte-for-byte, so
+    # each config reseeds the shared generator from its own spawned sequence
+    reseed(seed_seq)
+    p = n_states/1_000_000_000
+    # terminate flags and transitions only depend on (n_states, n_actions, p),
+    # so they are sampled once and shared across the n_rewards variants
+    terminate_s_flags = terminate_s(n_states, p=p)
+    transitions = transition(MDPTransitionType.SA_DETERMINISTIC, n_states, n_actions)
+    for n_rewards in all_n_rewards:
+        create(n_states, n_actions, n_rewards,
+                p=p, n_replay=10_000, max_step=1_000,
+                random_play_p=0.5, verbose=False,
+                base_dir="Project/mva-Decision-Transformer-project/data/mdp",
+                terminate_s_flags=terminate_s_flags,
+                transitions=transitions,
+        )
+
+
 if __name__ == "__main__":
-    for n_states in tqdm([10, 100, 1_000, 10_000, 10_000, 100_000, 1_000_000], "S"):
-        print("States :", n_states)
-        for n_actions in [2, 3, 4, 5, 10, 20, 50, 100]:
-            print("Actions :", n_actions)
-            for n_rewards in [2, 3, 4, 5, 10]:
-                create(n_states, n_actions, n_rewards, 
-                        p=(n_states/1_000_000_000), n_replay=10_000, max_step=1_000, 
-                        random_play_p=0.5, verbose=False,
-                        base_dir="Project/mva-Decision-Transformer-project/data/mdp",
-                )
+    # each config is independent and CPU-bound, so the grid scales with cores;
+    # the grid must stay duplicate-free, otherwise two workers would write the
+    # same data directory concurrently with differently-seeded MDPs
+    grid = [(n_states, n_actions)
+            for n_states in [10, 100, 1_000, 10_000, 100_000, 1_000_000]
+            for n_actions in [2, 3, 4, 5, 10, 20, 50, 100]]
+    seed_seqs = np.random.SeedSequence().spawn(len(grid))
+    configs = [(n_states, n_actions, [2, 3, 4, 5, 10], seed_seq)
+               for (n_states, n_actions), seed_seq in zip(grid, seed_seqs)]
+
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        list(tqdm(executor.map(_create_config, configs), total=len(configs), desc="configs"))
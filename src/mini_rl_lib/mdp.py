@@ -53,8 +53,15 @@ class MarkovDecisionProcess(gym.Env):
     """
 
     def __init__(self, config: MDPConfig):
-        self.config = config 
-        
+        self.config = config
+
+        # precomputed Bellman arrays, filled in by MDPFactory when available
+        self.P = None
+        self.R = None
+        self.ER = None
+        self.transitions = None
+
+
         
     def init(self,
             states: Union[DiscreteWrapper, gym.spaces.Space], 
@@ -107,11 +114,11 @@ class MarkovDecisionProcess(gym.Env):
         :param s: current state
         :param a (optional): action
         :param next_s (optional): next state 
-        :return 
+        :return
             transition type = S/SA and Deterministic
                 next_s: next_state
             transition type = S/SA and Probabilistic
-                dict: key = next_s, value = probability
+                np.ndarray: probability over next states, indexed by next_s
             transition type = SAS
                 float: probability
         """
@@ -127,10 +134,7 @@ class MarkovDecisionProcess(gym.Env):
             next_s_probs = self._transition_function(s, None, None)
             if self.config.n_states != -1:
                 assert len(next_s_probs) == self.config.n_states
-            next_ss, probs = list(next_s_probs.keys()), list(next_s_probs.values())
-            for next_s in next_ss:
-                assert self.observation_space.contains(next_s), str(next_s)
-            #assert np.sum(probs) == 1
+            #assert np.sum(next_s_probs) == 1
             return next_s_probs
 
         assert a is not None
@@ -145,10 +149,7 @@ class MarkovDecisionProcess(gym.Env):
             next_s_probs = self._transition_function(s, a, None)
             if self.config.n_states != -1:
                 assert len(next_s_probs) == self.config.n_states
-            next_ss, probs = list(next_s_probs.keys()), list(next_s_probs.values())
-            for next_s in next_ss:
-                assert self.observation_space.contains(next_s), str(next_s)
-            #assert np.sum(probs) == 1
+            #assert np.sum(next_s_probs) == 1
             return next_s_probs
 
         assert next_s is not None
@@ -210,9 +211,8 @@ class MarkovDecisionProcess(gym.Env):
 
         elif self.config.transition_function_type in (MDPTransitionType.S_PROBABILISTIC,
                                                       MDPTransitionType.SA_PROBABILISTIC):
-            next_s_probs = self.transition_function(s, a, None)
-            next_ss, probs = list(next_s_probs.keys()), list(next_s_probs.values())
-            next_s = self.np_random.choice(next_ss, p=probs)
+            probs = self.transition_function(s, a, None)
+            next_s = self.np_random.choice(len(probs), p=probs)
             
         else:
             probs = []
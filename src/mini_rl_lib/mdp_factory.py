@@ -4,8 +4,8 @@
 # Ben Kabongo
 # M2 MVA, ENS Paris-Saclay
 
-import json
 import numpy as np
+import orjson
 from collections import namedtuple
 
 from .enums import MDPTransitionType, MDPRewardType, SpaceType, PolicyType
@@ -72,46 +72,58 @@ class MDPFactory(object):
         self.rewards = rewards
         self.all_rewards = all_rewards
 
-        terminate_function = lambda s: self.terminate_s_flags[s]
-
-        def transition_function(s, a, next_s):
-            if config.transition_function_type is MDPTransitionType.S_DETERMINISTIC:
-                return int(self.transitions[s])
+        self.ER = None
+        if config.reward_function_type is MDPRewardType.SASR:
+            # expected reward over all_rewards, so consumers skip the per-r loop
+            self.ER = self.rewards @ self.all_rewards
 
-            if config.transition_function_type is MDPTransitionType.S_PROBABILISTIC:
-                probas = self.transitions[s]
-                next_ss = np.arange(len(probas))
-                return dict(zip(next_ss, probas))
+        self.P, self.R = self._bellman_matrices(config)
+        self.model.P = self.P
+        self.model.R = self.R
+        self.model.ER = self.ER
+        self.model.transitions = self.transitions
 
-            if config.transition_function_type is MDPTransitionType.SA_DETERMINISTIC:
-                return int(self.transitions[s, a])
+        terminate_function = lambda s: self.terminate_s_flags[s]
 
-            if config.transition_function_type is MDPTransitionType.SA_PROBABILISTIC:
-                probas = self.transitions[s, a]
-                next_ss = np.arange(len(probas))
-                return dict(zip(next_ss, probas))
+        # the right closure is bound once here, so the hot paths do a single
+        # array lookup per call instead of re-testing the type every time
 
-            if config.transition_function_type is MDPTransitionType.SAS:
+        if config.transition_function_type is MDPTransitionType.S_DETERMINISTIC:
+            def transition_function(s, a, next_s):
+                return int(self.transitions[s])
+        elif config.transition_function_type is MDPTransitionType.S_PROBABILISTIC:
+            def transition_function(s, a, next_s):
+                return self.transitions[s]
+        elif config.transition_function_type is MDPTransitionType.SA_DETERMINISTIC:
+            def transition_function(s, a, next_s):
+                return int(self.transitions[s, a])
+        elif config.transition_function_type is MDPTransitionType.SA_PROBABILISTIC:
+            def transition_function(s, a, next_s):
+                return self.transitions[s, a]
+        elif config.transition_function_type is MDPTransitionType.SAS:
+            def transition_function(s, a, next_s):
                 return self.transitions[s, a, next_s]
-
+        else:
             raise ValueError("Unknown transition type")
 
-        def reward_function(s, a, next_s, r):
-            if config.reward_function_type is MDPRewardType.S:
+        if config.reward_function_type is MDPRewardType.S:
+            def reward_function(s, a, next_s, r):
                 return self.rewards[s]
-
-            if config.reward_function_type is MDPRewardType.SA:
+        elif config.reward_function_type is MDPRewardType.SA:
+            def reward_function(s, a, next_s, r):
                 return self.rewards[s, a]
-
-            if config.reward_function_type is MDPRewardType.SAS:
-                return self.rewards[s, a, s]
-
-            if config.reward_function_type is MDPRewardType.SASR:
-                i = list(self.all_rewards).index(r)
+        elif config.reward_function_type is MDPRewardType.SAS:
+            def reward_function(s, a, next_s, r):
+                return self.rewards[s, a, next_s]
+        elif config.reward_function_type is MDPRewardType.SASR:
+            self._reward_index = {float(r): i for i, r in enumerate(self.all_rewards)}
+            def reward_function(s, a, next_s, r):
+                i = self._reward_index[float(r)]
                 return self.rewards[s, a, next_s, i]
-            
+        else:
             raise ValueError("Unknown reward type")
-            
+
+
         observation_wrapper = DiscreteObservationWrapper(self.model, Range(config.n_states))
         action_wrapper = DiscreteActionWrapper(self.model, Range(config.n_actions))
 
@@ -139,8 +151,55 @@ class MDPFactory(object):
         self.policy_type = policy_type
 
 
+    def _bellman_matrices(self, config):
+        """ Transition representation and expected reward matrix R[s, a]
+
+        Probabilistic/SAS configs get a dense tensor P[s, a, s'] so backups
+        run as one matrix product. For the deterministic types P stays None:
+        each (s, a) row would hold a single 1, so backups index V with the
+        next-state table directly and no O(S^2 A) tensor is ever built.
+        """
+        n_states = config.n_states
+        n_actions = config.n_actions
+
+        deterministic = config.transition_function_type in (
+            MDPTransitionType.S_DETERMINISTIC, MDPTransitionType.SA_DETERMINISTIC)
+
+        if deterministic:
+            next_states = self.transitions
+            if next_states.ndim == 1:
+                next_states = np.repeat(next_states[:, np.newaxis], n_actions, axis=1)
+
+            P = None
+            if config.reward_function_type is MDPRewardType.S:
+                R = np.repeat(self.rewards[:, np.newaxis], n_actions, axis=1)
+            elif config.reward_function_type is MDPRewardType.SA:
+                R = self.rewards
+            else:
+                ER = self.rewards if config.reward_function_type is MDPRewardType.SAS else self.ER
+                R = ER[np.arange(n_states)[:, np.newaxis], np.arange(n_actions), next_states]
+            return P, R
+
+        if config.transition_function_type is MDPTransitionType.S_PROBABILISTIC:
+            P = np.repeat(self.transitions[:, np.newaxis, :], n_actions, axis=1)
+        else:
+            P = self.transitions
+
+        if config.reward_function_type is MDPRewardType.S:
+            ER = self.rewards[:, np.newaxis, np.newaxis]
+        elif config.reward_function_type is MDPRewardType.SA:
+            ER = self.rewards[:, :, np.newaxis]
+        elif config.reward_function_type is MDPRewardType.SAS:
+            ER = self.rewards
+        else:
+            ER = self.ER
+
+        R = (P * ER).sum(-1)
+        return P, R
+
+
     @classmethod
-    def new(cls, transition_function_type, reward_function_type, 
+    def new(cls, transition_function_type, reward_function_type,
             n_states, n_actions, n_rewards, 
             p=0.2, gamma=0.99, eps=1e-3, alpha=1e-3,
             policy_type=PolicyType.VI
@@ -170,8 +229,8 @@ class MDPFactory(object):
     @classmethod
     def load(cls, filename):
         data = dict()
-        with open(filename, "r") as file:
-            data = json.load(file)
+        with open(filename, "rb") as file:
+            data = orjson.loads(file.read())
         data = MDPFactory.Data(**data)
         
         config = MDPConfig(
@@ -206,13 +265,13 @@ class MDPFactory(object):
             eps=self.policy.eps, 
             alpha=1e-3 if self.policy_type in (PolicyType.VI, PolicyType.PI) else self.policy.alpha,
             policy_type=self.policy_type.value,
-            terminate_s_flags=(1 * self.terminate_s_flags).tolist(),
-            transitions=self.transitions.tolist(),
-            rewards=self.rewards.tolist(),
-            all_rewards=self.all_rewards.tolist()
+            terminate_s_flags=1 * self.terminate_s_flags,
+            transitions=self.transitions,
+            rewards=self.rewards,
+            all_rewards=self.all_rewards
         )
-        with open(filename, "w") as file:
-            json.dump(data, file)
+        with open(filename, "wb") as file:
+            file.write(orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY))
 
 
     def train_policy(self, **args):
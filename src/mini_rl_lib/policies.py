@@ -10,6 +10,60 @@ import numpy as np
 from . import enums
 from . import mdp
 
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+try:
+    import jax
+    import jax.numpy as jnp
+    jax.config.update("jax_enable_x64", True)
+    HAS_JAX = True
+except ImportError:
+    HAS_JAX = False
+
+
+if HAS_NUMBA:
+
+    @njit(parallel=True, cache=True)
+    def _vi_sweep_det(values, next_states, R, gamma):
+        """ One Bellman sweep when next_states[s, a] is a deterministic index """
+        n_states, n_actions = R.shape
+        new_values = np.empty(n_states)
+        policy = np.zeros(n_states, dtype=np.int64)
+        for s in prange(n_states):
+            best = R[s, 0] + gamma * values[next_states[s, 0]]
+            best_a = 0
+            for a in range(1, n_actions):
+                v = R[s, a] + gamma * values[next_states[s, a]]
+                if v > best:
+                    best = v
+                    best_a = a
+            new_values[s] = best
+            policy[s] = best_a
+        return new_values, policy
+
+
+    @njit(parallel=True, cache=True)
+    def _vi_sweep_prob(values, P, R, gamma):
+        """ One Bellman sweep over a dense transition tensor P[s, a, s'] """
+        n_states, n_actions = R.shape
+        new_values = np.empty(n_states)
+        policy = np.zeros(n_states, dtype=np.int64)
+        for s in prange(n_states):
+            best = -np.inf
+            best_a = 0
+            for a in range(n_actions):
+                v = R[s, a] + gamma * np.dot(P[s, a], values)
+                if v > best:
+                    best = v
+                    best_a = a
+            new_values[s] = best
+            policy[s] = best_a
+        return new_values, policy
+
 
 class MDPPolicy(object):
     
@@ -51,7 +105,10 @@ class DeterministicMDPPolicy(MDPPolicy):
             if self.model.config.reward_function_type is not enums.MDPRewardType.SASR:
                 r = self.model.reward_function(s, a, next_s, None)
                 v =  r + self.gamma * self._values[next_s]
-                
+
+            elif self.model.ER is not None:
+                v = self.model.ER[s, a, next_s] + self.gamma * self._values[next_s]
+
             else:
                 for r in self.model.all_rewards:
                     p_r = self.model.reward_function(s, a, next_s, r)
@@ -68,9 +125,13 @@ class DeterministicMDPPolicy(MDPPolicy):
 
         elif self.model.config.transition_function_type in (enums.MDPTransitionType.S_PROBABILISTIC,
                                                             enums.MDPTransitionType.SA_PROBABILISTIC):
-            next_s_probs = self.model.transition_function(s, a, None)
-            for next_s, p_s in next_s_probs.items():
-                v += p_s * get_value(s, a, next_s)
+            probas = self.model.transition_function(s, a, None)
+            if self.model.R is not None:
+                # expected reward is already folded into R, so the backup is one dot product
+                v = self.model.R[s, a] + self.gamma * np.dot(probas, self._values)
+            else:
+                for next_s in range(len(probas)):
+                    v += probas[next_s] * get_value(s, a, next_s)
             
         else:
             for next_s in range(self.model.config.n_states):
@@ -82,23 +143,106 @@ class DeterministicMDPPolicy(MDPPolicy):
 
 class ValueIteration(DeterministicMDPPolicy):
 
-    def __init__(self, model: mdp.MDP, gamma: float=1e-3, eps: float=1e-3):
+    def __init__(self, model: mdp.MDP, gamma: float=1e-3, eps: float=1e-3, backend: str="numpy"):
         super().__init__(model, gamma, eps)
+        if backend == "jax" and not HAS_JAX:
+            backend = "numpy"
+        self.backend = backend
+
+
+    def _fit_jax(self):
+        """ Runs the whole convergence loop on the XLA device: the Bellman
+        backup is jit-compiled and iterated inside a lax.while_loop, in
+        float64 (float32 backups are not stable enough near eps) """
+        n_states = self.model.config.n_states
+        n_actions = self.model.config.n_actions
+        R = jnp.asarray(self.model.R)
+        gamma = self.gamma
+        eps = self.eps
+
+        if self.model.P is None:
+            next_states = self.model.transitions
+            if next_states.ndim == 1:
+                next_states = np.repeat(next_states[:, np.newaxis], n_actions, axis=1)
+            next_states = jnp.asarray(next_states)
+
+            def backup(values):
+                return R + gamma * values[next_states]
+        else:
+            P = jnp.asarray(self.model.P.reshape(n_states * n_actions, n_states))
+            R_flat = R.ravel()
+
+            def backup(values):
+                return (R_flat + gamma * P.dot(values)).reshape(n_states, n_actions)
+
+        @jax.jit
+        def solve(values):
+            def cond(carry):
+                return carry[1] > eps
+            def body(carry):
+                values, _ = carry
+                new_values = backup(values).max(axis=1)
+                return new_values, jnp.max(jnp.abs(new_values - values))
+            values, _ = jax.lax.while_loop(cond, body, (values, jnp.inf))
+            Q = backup(values)
+            return Q.max(axis=1), Q.argmax(axis=1)
+
+        values, policy = solve(jnp.asarray(self._values))
+        self._values = np.asarray(values)
+        self._policy = np.asarray(policy)
 
 
     def fit(self, **args):
-        delta = self.eps + 1
-        while delta > self.eps:
-            delta = 0
-            for s in range(self.model.config.n_states):
-                v = self._values[s]
-                values = np.zeros(self.model.config.n_actions)
-                for a in range(self.model.config.n_actions):
-                    va = self._update_value(s, a)
-                    values[a] = va
-                self._values[s] = np.max(values)
-                self._policy[s] = np.argmax(values)
-                delta = max(delta, np.abs(v - self._values[s]))
+        if self.backend == "jax":
+            return self._fit_jax()
+
+        n_states = self.model.config.n_states
+        n_actions = self.model.config.n_actions
+        R = self.model.R
+        gamma = self.gamma
+        deterministic = self.model.config.transition_function_type in (
+            enums.MDPTransitionType.S_DETERMINISTIC,
+            enums.MDPTransitionType.SA_DETERMINISTIC)
+
+        if deterministic:
+            next_states = self.model.transitions
+            if next_states.ndim == 1:
+                next_states = np.repeat(next_states[:, np.newaxis], n_actions, axis=1)
+            if HAS_NUMBA:
+                sweep = lambda values: _vi_sweep_det(values, next_states, R, gamma)
+            else:
+                # blocked over states so the Q temporaries stay cache-sized
+                # instead of materializing the full (S, A) array per sweep
+                block = 16384
+                def sweep(values):
+                    new_values = np.empty(n_states)
+                    policy = np.empty(n_states, dtype=int)
+                    for s0 in range(0, n_states, block):
+                        s1 = min(s0 + block, n_states)
+                        Q = R[s0:s1] + gamma * values[next_states[s0:s1]]
+                        new_values[s0:s1] = Q.max(axis=1)
+                        policy[s0:s1] = Q.argmax(axis=1)
+                    return new_values, policy
+        elif HAS_NUMBA:
+            P = self.model.P
+            sweep = lambda values: _vi_sweep_prob(values, P, R, gamma)
+        else:
+            P = self.model.P.reshape(n_states * n_actions, n_states)
+            R_flat = R.ravel()
+            def sweep(values):
+                Q = (R_flat + gamma * P.dot(values)).reshape(n_states, n_actions)
+                return Q.max(axis=1), Q.argmax(axis=1)
+
+        values = self._values
+        while True:
+            new_values, policy = sweep(values)
+            delta = np.max(np.abs(new_values - values))
+            values = new_values
+            if delta <= self.eps:
+                break
+
+        self._values = values
+        self._policy = policy
 
 
 VI = ValueIteration
@@ -123,12 +267,11 @@ class PolicyIteration(DeterministicMDPPolicy):
     def _policy_evaluation(self):
         delta = self.eps + 1
         while delta > self.eps:
-            delta = 0
+            previous_values = self._values.copy()
             for s in range(self.model.config.n_states):
-                v = self._values[s]
                 a = self._policy[s]
                 self._values[s] = self._update_value(s, a)
-                delta = max(delta, np.abs(v - self._values[s]))
+            delta = float(np.max(np.abs(self._values - previous_values)))
 
     
     def _policy_improvement(self):
@@ -9,6 +9,7 @@ import numpy as np
 
 from . import mdp
 from .policies import MDPPolicy
+from .utils import rng
 
 
 class TDPolicy(MDPPolicy):
@@ -26,8 +27,8 @@ class TDPolicy(MDPPolicy):
 
 
     def choose_action(self, s: int=None) -> int:
-        if np.random.random() < self.eps:
-            a = np.random.choice(np.arange(self.model.config.n_actions))
+        if rng.random() < self.eps:
+            a = rng.integers(self.model.config.n_actions)
         else:
             a = np.argmax(self.Q[s, :])
         return a
@@ -81,7 +82,7 @@ class DoubleQLearning(TDPolicy):
             while not done:
                 a = self.choose_action(s)
                 next_s, r, terminated, truncated, info = self.model.step(a)
-                if np.random.random() < .5:
+                if rng.random() < .5:
                     self.Q[s, a] = self.Q[s, a] + self.alpha * (
                         r + self.gamma * self.Q_[s, np.argmax(self.Q[next_s, :])] - self.Q[s, a])
                 else:
@@ -92,8 +93,8 @@ class DoubleQLearning(TDPolicy):
 
 
     def choose_action(self, s: int=None) -> int:
-        if np.random.random() < self.eps:
-            a = np.random.choice(np.arange(self.model.config.n_actions))
+        if rng.random() < self.eps:
+            a = rng.integers(self.model.config.n_actions)
         else:
             a = np.argmax(self.Q[s, :] + self.Q_[s, :])
         return a
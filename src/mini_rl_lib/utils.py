@@ -9,11 +9,21 @@ import numpy as np
 
 from .enums import MDPTransitionType, MDPRewardType
 
+# PCG64 generator shared by all sampling helpers; faster than the legacy
+# global RandomState and reused instead of being re-seeded per call
+rng = np.random.default_rng()
+
+
+def reseed(seed=None):
+    """ Reseeds the shared generator in place, so modules (and forked pool
+    workers) holding a reference to it pick up the new stream """
+    rng.bit_generator.state = np.random.PCG64(seed).state
+
 
 ## Terminate functions ############################################################################
 
 def terminate_s(n_states, p=0.1, exclude_start=True):
-    states = np.random.choice([True, False], p=[p, 1-p], size=n_states)
+    states = rng.choice([True, False], p=[p, 1-p], size=n_states)
     if exclude_start:
         states[0] = False
     if np.all(states == False):
@@ -28,23 +38,23 @@ def transition_s_deterministic(n_states):
     for s in range(n_states):
         other_s = list(range(n_states))
         del other_s[s]
-        transitions[s] = np.random.choice(other_s)
+        transitions[s] = rng.choice(other_s)
     return transitions
 
 
 def transition_s_probabilistic(n_states, high=10):
-    probas = np.random.randint(low=1, high=high+1, size=(n_states, n_states))
+    probas = rng.integers(low=1, high=high+1, size=(n_states, n_states))
     probas -= 1 * np.any(probas > 1, axis=1)[:, np.newaxis]
     probas = probas / probas.sum(1)[:, np.newaxis]
     return probas
 
 
 def transition_sa_deterministic(n_states, n_actions):
-    return np.random.randint(low=0, high=n_states, size=(n_states, n_actions))
+    return rng.integers(low=0, high=n_states, size=(n_states, n_actions))
 
 
 def transition_sa_probabilistic(n_states, n_actions, high=10):
-    probas = np.random.randint(low=1, high=high+1, size=(n_states, n_actions, n_states))
+    probas = rng.integers(low=1, high=high+1, size=(n_states, n_actions, n_states))
     probas -= 1 * np.any(probas > 1, axis=2)[:, :, np.newaxis]
     probas = probas / probas.sum(2)[:, :, np.newaxis]
     return probas
@@ -69,7 +79,7 @@ def reward_s(n_states, terminate_states, other_rewards=[0], max_reward=1):
     if len(other_rewards) == 1:
         rewards = other_rewards[0] * np.ones(n_states)
     else:
-        rewards = np.random.choice(other_rewards, size=n_states)
+        rewards = rng.choice(other_rewards, size=n_states)
     rewards[terminate_states] = max_reward
     return rewards
     
@@ -78,7 +88,7 @@ def reward_sa(n_states, n_actions, terminate_states, transitions, other_rewards=
     if len(other_rewards) == 1:
         rewards = other_rewards[0] * np.ones((n_states, n_actions))
     else:
-        rewards = np.random.choice(other_rewards, size=(n_states, n_actions))
+        rewards = rng.choice(other_rewards, size=(n_states, n_actions))
     for s in range(n_states):
         for a in range(n_actions):
             if terminate_states[transitions[s, a]]:
@@ -90,7 +100,7 @@ def reward_sas(n_states, n_actions, terminate_states, other_rewards=[0], max_rew
     if len(other_rewards) == 1:
         rewards = other_rewards[0] * np.ones((n_states, n_actions, n_states))
     else:
-        rewards = np.random.choice(other_rewards, size=(n_states, n_actions, n_states))
+        rewards = rng.choice(other_rewards, size=(n_states, n_actions, n_states))
     for s in range(n_states):
         for a in range(n_actions):
             for next_s in range(n_states):
@@ -107,7 +117,7 @@ def reward_sasr(n_states, n_actions, n_rewards, terminate_states, high=10):
                 if terminate_states[next_s]:
                     rewards[s, a, next_s, -1] = 1.
                 else:
-                    probas = np.random.randint(low=1, high=high + 1, size=n_rewards - 1)
+                    probas = rng.integers(low=1, high=high + 1, size=n_rewards - 1)
                     if np.any(probas > 1):
                         probas = probas - 1
                     probas = probas / probas.sum()